@@ -1,10 +1,14 @@
 """Main Telegram bot functionality."""
 import os
+import time
 import logging
+import contextlib
+import functools
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Callable, Tuple, BinaryIO
 from dotenv import load_dotenv
-from telegram import Update
+from telegram import Update, Message
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -13,7 +17,8 @@ from telegram.ext import (
     filters
 )
 from pcloud import PyCloud
-from .downloader import YouTubeDownloader
+from .downloader import YouTubeDownloader, VideoInfo
+from .pcloud_upload import upload_stream, upload_files, UploadError
 from .utils import (
     setup_temp_directory,
     cleanup_old_files,
@@ -24,12 +29,12 @@ from .utils import (
     get_file_size
 )
 import asyncio
-import nest_asyncio
-from queue import Queue
-from threading import Event
+from concurrent.futures import ThreadPoolExecutor
 
-# Apply nest_asyncio to allow nested event loops
-nest_asyncio.apply()
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 # Load environment variables
 load_dotenv()
@@ -41,6 +46,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+UPLOAD_SUCCESS_MESSAGE = "✅ File uploaded successfully to pCloud. You can find it in your pCloud account."
+
+# Progress reporting: minimum seconds between status message edits
+PROGRESS_EDIT_INTERVAL = 2.0
+
+# Marks the end of a job's progress updates
+_PROGRESS_DONE = object()
+
+@functools.cache
+def _get_pcloud(email: str, password: str) -> PyCloud:
+    """Log in to pCloud once per set of credentials and reuse the client."""
+    return PyCloud(email, password)
+
+def _log_task_exception(task: asyncio.Task) -> None:
+    """Log why a background task failed, so the error is never silently dropped."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Task %s failed", task.get_name(), exc_info=task.exception())
+
+@dataclass
+class ConversionJob:
+    """State of a single URL as it moves through the download/upload pipeline."""
+    url: str
+    status_message: Message
+    folder_task: asyncio.Task
+    video_info: Optional[VideoInfo] = None
+    output_path: Optional[str] = None
+    folder_id: Optional[int] = None
+    progress_queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    progress_task: Optional[asyncio.Task] = None
+    loop: asyncio.AbstractEventLoop = field(default_factory=asyncio.get_running_loop)
+
+    @property
+    def upload_name(self) -> str:
+        """Name of the MP3 in pCloud; the temporary file has a unique name of its own."""
+        return f"{get_safe_filename(self.video_info.title)}.mp3"
+
+    def progress_callback(self, progress: float, status: str) -> None:
+        """Queue a progress update; safe to call from worker threads."""
+        self.loop.call_soon_threadsafe(self.progress_queue.put_nowait, (progress, status))
+
+    def show_stage(self, text: str) -> None:
+        """Queue a stage message; it replaces any throttled progress update and is shown right away."""
+        self.progress_queue.put_nowait(text)
+
 class YouTubeBot:
     def __init__(self):
         # Validate required environment variables
@@ -53,14 +102,18 @@ class YouTubeBot:
         self.pcloud_base_folder = os.getenv('PCLOUD_BASE_FOLDER')
         self.pcloud_link_expire_days = int(os.getenv('PCLOUD_LINK_EXPIRE_DAYS', '7'))
         self.allowed_users = [int(id) for id in os.getenv('ALLOWED_USER_IDS', '').split(',') if id]
+        self.stream_uploads = os.getenv('STREAM_UPLOADS', 'false').lower() == 'true'
+        self.cleanup_hours = int(os.getenv('CLEANUP_OLDER_THAN', '24'))
+
+        # Folder IDs by path, filled lazily to avoid repeated listfolder calls
+        self._folderid_cache: dict[str, int] = {}
 
         # Initialize pCloud with OAuth2
         try:
-            self.pcloud = PyCloud(
+            self.pcloud = _get_pcloud(
                 os.getenv('PCLOUD_EMAIL'),
                 os.getenv('PCLOUD_PASSWORD')
             )
-            self._ensure_pcloud_folder()
         except Exception as e:
             raise RuntimeError(f"Failed to initialize pCloud: {e}")
 
@@ -70,8 +123,26 @@ class YouTubeBot:
         # Initialize downloader
         self.downloader = YouTubeDownloader(self.temp_dir)
 
+        # Shared pool for blocking yt-dlp work; one download worker per thread
+        self.download_workers = int(os.getenv('DL_WORKERS', str(os.cpu_count() or 1)))
+        self._download_pool = ThreadPoolExecutor(
+            max_workers=self.download_workers, thread_name_prefix='download'
+        )
+
+        # Download/upload pipeline, started once the application is running
+        self._download_queue: asyncio.Queue = asyncio.Queue()
+        self._upload_queue: asyncio.Queue = asyncio.Queue()
+        self._delete_queue: asyncio.Queue = asyncio.Queue()
+        self._pipeline_task: Optional[asyncio.Task] = None
+
         # Create application
-        self.application = Application.builder().token(self.token).build()
+        self.application = (
+            Application.builder()
+            .token(self.token)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         
         # Add handlers
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -79,92 +150,137 @@ class YouTubeBot:
         self.application.add_handler(CommandHandler("cleanup", self.cleanup_command))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_youtube_url))
 
-    def _ensure_pcloud_folder(self) -> None:
+    def _cache_folder_id(self, path: str, result: Optional[dict]) -> None:
+        """Remember the folder ID from a pCloud folder response, if it has one."""
+        if result and 'metadata' in result and 'folderid' in result['metadata']:
+            self._folderid_cache[path.strip('/')] = result['metadata']['folderid']
+
+    async def _pcloud(self, method: str, **params) -> dict:
+        """Call a PyCloud API method in a worker thread so it never blocks the event loop."""
+        return await asyncio.to_thread(getattr(self.pcloud, method), **params)
+
+    async def _get_folder_id(self, path: str) -> int:
+        """Get a pCloud folder ID by path, using the in-process cache when possible."""
+        key = path.strip('/')
+        if key not in self._folderid_cache:
+            folder_info = await self._pcloud('listfolder', path=path)
+            if not folder_info or 'metadata' not in folder_info or 'folderid' not in folder_info['metadata']:
+                raise Exception(f"Could not find folder: {path}")
+            self._cache_folder_id(path, folder_info)
+        return self._folderid_cache[key]
+
+    def _forget_missing_folders(self, error: Exception) -> None:
+        """Drop cached folder IDs if pCloud reports that a folder no longer exists."""
+        message = str(error).lower()
+        if "not found" in message or "does not exist" in message:
+            self._folderid_cache.clear()
+
+    def _cache_folder_tree(self, metadata: dict, path: str) -> None:
+        """Cache the IDs of a folder and all its subfolders from a recursive listfolder result."""
+        self._folderid_cache[path] = metadata['folderid']
+        for item in metadata.get('contents', []):
+            if item.get('isfolder'):
+                self._cache_folder_tree(item, f"{path}/{item['name']}")
+
+    async def _ensure_pcloud_folder(self) -> None:
         """Ensure the base folder exists in pCloud."""
         try:
-            # Create base folder if it doesn't exist
-            folder_path = self.pcloud_base_folder.strip('/')
+            segments = [folder for folder in self.pcloud_base_folder.strip('/').split('/') if folder]
+            if not segments:
+                return
+
+            # A single recursive listing of the top-level folder shows which
+            # segments (and date folders) already exist
+            tree = await self._pcloud('listfolder', path=f"/{segments[0]}", recursive=1, nofiles=1)
+            if tree and 'metadata' in tree:
+                self._cache_folder_tree(tree['metadata'], segments[0])
+
+            # Create only the missing segments, starting from the root folder
+            parent_id = 0
             current_path = ""
+            for folder in segments:
+                current_path = f"{current_path}/{folder}".lstrip('/')
+                if current_path not in self._folderid_cache:
+                    result = await self._pcloud('createfolder', name=folder, folderid=parent_id)
+                    if not result or 'metadata' not in result:
+                        raise Exception(f"Could not create folder {current_path}: {result}")
+                    self._cache_folder_id(current_path, result)
+                parent_id = self._folderid_cache[current_path]
             
-            for folder in folder_path.split('/'):
-                if not folder:
-                    continue
-                if not current_path:
-                    # Create first level folder
-                    try:
-                        self.pcloud.createfolder(name=folder)
-                        current_path = folder
-                    except Exception as e:
-                        if "folder already exists" not in str(e).lower():
-                            raise
-                else:
-                    # Create nested folder
-                    try:
-                        # First get the parent folder ID
-                        parent_info = self.pcloud.listfolder(path=current_path)
-                        if not parent_info or 'metadata' not in parent_info or 'folderid' not in parent_info['metadata']:
-                            raise Exception(f"Could not find parent folder: {current_path}")
-                        
-                        parent_id = parent_info['metadata']['folderid']
-                        self.pcloud.createfolder(name=folder, folderid=parent_id)
-                        current_path = f"{current_path}/{folder}"
-                    except Exception as e:
-                        if "folder already exists" not in str(e).lower():
-                            raise
-            
-            logger.info(f"Ensured pCloud folder exists: {self.pcloud_base_folder}")
+            logger.info("Ensured pCloud folder exists: %s", self.pcloud_base_folder)
         except Exception as e:
             raise RuntimeError(f"Failed to create pCloud folder structure: {e}")
 
-    def _get_date_folder(self) -> str:
+    async def _get_date_folder(self) -> str:
         """Get the current date folder path."""
         today = datetime.now().strftime('%Y-%m-%d')
         folder_path = f"{self.pcloud_base_folder.rstrip('/')}/{today}"
+        if folder_path.strip('/') in self._folderid_cache:
+            return folder_path
         try:
             # First get the parent folder ID
-            parent_info = self.pcloud.listfolder(path=self.pcloud_base_folder)
-            if not parent_info or 'metadata' not in parent_info or 'folderid' not in parent_info['metadata']:
-                raise Exception(f"Could not find parent folder: {self.pcloud_base_folder}")
-            
-            parent_id = parent_info['metadata']['folderid']
-            self.pcloud.createfolder(name=today, folderid=parent_id)
+            parent_id = await self._get_folder_id(self.pcloud_base_folder)
+            result = await self._pcloud('createfolder', name=today, folderid=parent_id)
+            self._cache_folder_id(folder_path, result)
         except Exception as e:
             if "folder already exists" not in str(e).lower():
                 raise
         return folder_path
 
-    async def _upload_to_pcloud(self, file_path: str, title: str) -> str:
-        """Upload file to pCloud and return confirmation message."""
-        try:
-            # Get target folder
-            folder_path = self._get_date_folder()
-            
-            # Get folder ID
-            folder_info = self.pcloud.listfolder(path=folder_path)
-            if not folder_info or 'metadata' not in folder_info or 'folderid' not in folder_info['metadata']:
-                raise Exception(f"Could not find folder: {folder_path}")
-            
-            folder_id = folder_info['metadata']['folderid']
-            
-            # Upload file
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
-                upload_result = self.pcloud.uploadfile(
-                    folderid=folder_id,
-                    filename=os.path.basename(file_path),
-                    data=file_data
-                )
+    async def _get_date_folder_and_id(self) -> Tuple[str, int]:
+        """Ensure the current date folder exists and return its path and folder ID."""
+        folder_path = await self._get_date_folder()
+        return folder_path, await self._get_folder_id(folder_path)
+
+    async def _upload_stream(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        folder_id: int,
+        total: int,
+        progress_callback: Optional[Callable[[float, str], None]] = None
+    ) -> int:
+        """Upload a binary stream to pCloud in chunks using the fileops API and return its file ID."""
+        # The whole upload runs in one thread so it keeps a single connection
+        return await asyncio.to_thread(
+            upload_stream, self.pcloud, stream, filename, folder_id, total, progress_callback
+        )
 
-            if not upload_result or 'fileids' not in upload_result:
-                raise Exception("Upload failed: No file ID returned")
+    async def _upload_file_chunked(
+        self,
+        file_path: str,
+        filename: str,
+        folder_id: int,
+        progress_callback: Optional[Callable[[float, str], None]] = None
+    ) -> int:
+        """Upload a file to pCloud under the given name in chunks using the fileops API and return its file ID."""
+        with open(file_path, 'rb') as f:
+            return await self._upload_stream(
+                f, filename, folder_id, get_file_size(file_path), progress_callback
+            )
 
-            file_id = upload_result['fileids'][0]
-            logger.info(f"File uploaded successfully with ID: {file_id}")
+    async def _upload_files(self, files: List[Tuple[str, str]], folder_id: int) -> set:
+        """Upload several (path, name) files in a single uploadfile call and return the names pCloud stored."""
+        return await asyncio.to_thread(upload_files, self.pcloud, files, folder_id)
+
+    async def _upload_to_pcloud(
+        self,
+        file_path: str,
+        filename: str,
+        folder_id: int,
+        progress_callback: Optional[Callable[[float, str], None]] = None
+    ) -> str:
+        """Upload file to an already resolved pCloud folder and return confirmation message."""
+        try:
+            # Upload file chunk by chunk so a dropped connection only retries one chunk
+            file_id = await self._upload_file_chunked(file_path, filename, folder_id, progress_callback)
+            logger.info("File uploaded successfully with ID: %s", file_id)
             
-            return f"✅ File uploaded successfully to pCloud. You can find it in your pCloud account."
+            return UPLOAD_SUCCESS_MESSAGE
 
         except Exception as e:
-            logger.error(f"Error uploading to pCloud: {e}")
+            logger.error("Error uploading to pCloud: %s", e)
+            self._forget_missing_folders(e)
             raise
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -196,8 +312,7 @@ class YouTubeBot:
         if not self.is_user_allowed(update.effective_user.id):
             return
 
-        cleanup_hours = int(os.getenv('CLEANUP_OLDER_THAN', '24'))
-        cleanup_old_files(self.temp_dir, cleanup_hours)
+        await asyncio.to_thread(cleanup_old_files, self.temp_dir, self.cleanup_hours)
         await update.message.reply_text("Cleanup completed!")
 
     def is_user_allowed(self, user_id: int) -> bool:
@@ -210,103 +325,326 @@ class YouTubeBot:
             await update.message.reply_text("Sorry, you are not authorized to use this bot.")
             return
 
-        url = update.message.text
-        if not is_valid_youtube_url(url):
+        # A message may carry several whitespace-separated URLs
+        urls = update.message.text.split()
+        if not urls or not all(is_valid_youtube_url(url) for url in urls):
             await update.message.reply_text("Please send a valid YouTube URL.")
             return
 
-        # Send initial status message
-        status_message = await update.message.reply_text("Processing your request...")
-
+        # Resolve the pCloud date folder while the videos are being fetched
+        folder_task = asyncio.create_task(self._get_date_folder_and_id())
+        # Retrieve a failure even if every job gives up before awaiting the task
+        folder_task.add_done_callback(_log_task_exception)
+
+        # Send initial status messages and hand the URLs over to the pipeline
+        for url in urls:
+            status_message = await update.message.reply_text(f"Processing your request...\n{url}")
+            await self._download_queue.put(ConversionJob(url, status_message, folder_task))
+
+    async def _post_init(self, application: Application) -> None:
+        """Prepare pCloud and start the download/upload pipeline once the event loop is running."""
+        await self._ensure_pcloud_folder()
+        self._pipeline_task = asyncio.create_task(self._run_pipeline())
+        self._pipeline_task.add_done_callback(_log_task_exception)
+
+    async def _post_shutdown(self, application: Application) -> None:
+        """Stop the download/upload pipeline."""
+        if self._pipeline_task:
+            self._pipeline_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._pipeline_task
+        self._download_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_pipeline(self) -> None:
+        """Run the pipeline workers so an upload overlaps the next download."""
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(self.download_workers):
+                tg.create_task(self._download_worker())
+            tg.create_task(self._upload_worker())
+            tg.create_task(self._cleanup_worker())
+
+    async def _download_worker(self) -> None:
+        """Download queued URLs and pass the resulting MP3s to the upload worker."""
+        while True:
+            job = await self._download_queue.get()
+            try:
+                if await self._download(job):
+                    await self._upload_queue.put(job)
+            except Exception as e:
+                logger.error("Error processing YouTube URL: %s", e)
+                if job.output_path:
+                    self._delete_queue.put_nowait(job.output_path)
+                await self._finish_job(job, f"An error occurred: {str(e)}")
+            finally:
+                self._download_queue.task_done()
+
+    async def _upload_worker(self) -> None:
+        """Upload downloaded MP3s to pCloud, batching those that are ready together."""
+        while True:
+            batch = [await self._upload_queue.get()]
+            while not self._upload_queue.empty():
+                batch.append(self._upload_queue.get_nowait())
+            try:
+                await self._upload(batch)
+            except Exception as e:
+                logger.error("Error processing YouTube URL: %s", e)
+            finally:
+                for _ in batch:
+                    self._upload_queue.task_done()
+
+    async def _cleanup_worker(self) -> None:
+        """Delete uploaded temporary files off the request path, in batches."""
+        while True:
+            paths = [await self._delete_queue.get()]
+            while not self._delete_queue.empty():
+                paths.append(self._delete_queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._delete_files, paths)
+            finally:
+                for _ in paths:
+                    self._delete_queue.task_done()
+
+    def _delete_files(self, paths: List[str]) -> None:
+        """Remove temporary files; failures are logged by the downloader."""
+        for path in paths:
+            self.downloader.cleanup_file(path)
+
+    async def _report_progress(self, job: ConversionJob) -> None:
+        """Relay progress updates to the job's status message, editing it at most once per interval."""
+        last_text = None
+        last_edit_ts = 0.0
+        pending = None
+
+        async def edit(text: str) -> None:
+            nonlocal last_text, last_edit_ts
+            try:
+                await job.status_message.edit_text(text)
+            except Exception as e:
+                logger.error("Error updating progress: %s", e)
+            last_text, last_edit_ts = text, time.monotonic()
+
+        while True:
+            # Wait for the next update, but no longer than needed to flush a throttled one
+            timeout = None
+            if pending is not None:
+                timeout = max(0.0, last_edit_ts + PROGRESS_EDIT_INTERVAL - time.monotonic())
+            try:
+                item = await asyncio.wait_for(job.progress_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None
+
+            # Skip straight to the newest update, keeping the last stage message on the way
+            stage = None
+            while True:
+                if isinstance(item, str):
+                    stage, item = item, None
+                if item is _PROGRESS_DONE or job.progress_queue.empty():
+                    break
+                item = job.progress_queue.get_nowait()
+
+            if stage is not None:
+                # A stage message replaces older pending progress and is shown right away
+                pending = None
+                if stage != last_text:
+                    await edit(stage)
+            if item is _PROGRESS_DONE:
+                break
+
+            if item is not None:
+                progress, status = item
+                pending = (
+                    f"Converting: {job.video_info.title}\n{status}\n"
+                    f"Progress: {progress:.1f}%"
+                )
+            if pending is None or pending == last_text:
+                pending = None
+                continue
+            if time.monotonic() - last_edit_ts < PROGRESS_EDIT_INTERVAL:
+                continue
+
+            await edit(pending)
+            pending = None
+
+    async def _stop_progress(self, job: ConversionJob) -> None:
+        """Signal completion and wait for the job's progress task to finish."""
+        job.progress_queue.put_nowait(_PROGRESS_DONE)
+        if job.progress_task:
+            await job.progress_task
+
+    async def _finish_job(self, job: ConversionJob, text: str) -> None:
+        """Stop a job's progress updates and post its final status; a failed reply is only logged."""
+        await self._stop_progress(job)
         try:
-            # Get video info first
-            video_info = self.downloader.extract_video_info(url)
-            if not video_info:
-                await status_message.edit_text("Could not get video information.")
-                return
+            await job.status_message.edit_text(text)
+        except Exception as e:
+            logger.error("Error sending final status: %s", e)
+
+    async def _download(self, job: ConversionJob) -> bool:
+        """Download and convert a job's video. Returns True if the MP3 is ready for upload."""
+        # Get video info first
+        loop = asyncio.get_running_loop()
+        video_info = await loop.run_in_executor(
+            self._download_pool, self.downloader.extract_video_info, job.url
+        )
+        if not video_info:
+            await self._finish_job(job, "Could not get video information.")
+            return False
+        job.video_info = video_info
+
+        # Estimate file size
+        estimated_size = self.downloader.estimate_mp3_size(video_info)
+        size_mb = estimated_size / (1024 * 1024)
+
+        # Update status with video info
+        await job.status_message.edit_text(
+            f"Found: {video_info.title}\n"
+            f"Duration: {video_info.duration} seconds\n"
+            f"Estimated MP3 size: {size_mb:.1f}MB\n"
+            "Starting download..."
+        )
 
-            # Estimate file size
-            estimated_size = self.downloader.estimate_mp3_size(video_info)
-            size_mb = estimated_size / (1024 * 1024)
+        # Start the progress update task; it keeps running through the upload
+        job.progress_task = asyncio.create_task(self._report_progress(job))
 
-            # Update status with video info
-            await status_message.edit_text(
-                f"Found: {video_info.title}\n"
-                f"Duration: {video_info.duration} seconds\n"
-                f"Estimated MP3 size: {size_mb:.1f}MB\n"
-                "Starting download..."
-            )
+        if self.stream_uploads:
+            # Upload straight from the encoder; nothing is left for the upload worker
+            await self._stream_to_pcloud(job, estimated_size)
+            return False
 
-            # Create a queue for progress updates
-            progress_queue = Queue()
-            download_complete = Event()
-
-            def progress_callback(progress: float, status: str):
-                progress_queue.put((progress, status))
-
-            # Start a background task to handle progress updates
-            async def update_progress():
-                while not download_complete.is_set():
-                    try:
-                        if not progress_queue.empty():
-                            progress, status = progress_queue.get_nowait()
-                            await status_message.edit_text(
-                                f"Converting: {video_info.title}\n{status}\n"
-                                f"Progress: {progress:.1f}%"
-                            )
-                    except Exception as e:
-                        logger.error(f"Error updating progress: {e}")
-                    await asyncio.sleep(0.5)
-
-            # Start the progress update task
-            progress_task = asyncio.create_task(update_progress())
-
-            # Run the blocking operation in an executor
-            output_path, error = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.downloader.download_audio(url, progress_callback)
+        # Run the blocking download in the shared download pool
+        download = loop.run_in_executor(
+            self._download_pool,
+            functools.partial(
+                self.downloader.download_audio, job.url, job.progress_callback, info=video_info
             )
+        )
+        try:
+            folder_path, job.folder_id = await job.folder_task
+        except Exception:
+            # A running download can't be cancelled; delete its MP3 once it is done
+            download.add_done_callback(self._discard_download)
+            raise
+        output_path, error = await download
 
-            # Signal completion and wait for progress task to finish
-            download_complete.set()
-            await progress_task
+        if error:
+            await self._finish_job(job, f"Error: {error}")
+            return False
 
-            if error:
-                await status_message.edit_text(f"Error: {error}")
-                return
+        job.output_path = output_path
 
-            # Update status
-            await status_message.edit_text(
-                f"Download complete: {video_info.title}\n"
-                "Uploading to pCloud..."
+        # Update status through the progress task, so a pending update can't overwrite it
+        job.show_stage(
+            f"Download complete: {video_info.title}\n"
+            "Uploading to pCloud..."
+        )
+        return True
+
+    def _discard_download(self, download: asyncio.Future) -> None:
+        """Queue the MP3 of a download whose job has already failed for deletion."""
+        if not download.cancelled() and download.exception() is None:
+            output_path, _ = download.result()
+            if output_path:
+                self._delete_queue.put_nowait(output_path)
+
+    async def _stream_to_pcloud(self, job: ConversionJob, estimated_size: int) -> None:
+        """Convert a job's audio and upload it while it is being encoded, without a temporary file."""
+        loop = asyncio.get_running_loop()
+        file_id = None
+        try:
+            folder_path, job.folder_id = await job.folder_task
+            source, encoder = await loop.run_in_executor(
+                self._download_pool, self.downloader.stream_audio, job.url
             )
-
-            # Upload to pCloud
             try:
-                upload_message = await self._upload_to_pcloud(output_path, video_info.title)
-                
-                # Send success message with link
-                await status_message.edit_text(upload_message)
-            except Exception as e:
-                logger.error(f"Error uploading to pCloud: {e}")
-                await status_message.edit_text(
-                    "Error uploading the file to pCloud. Please try again later."
+                file_id = await self._upload_stream(
+                    encoder.stdout, job.upload_name, job.folder_id, estimated_size, job.progress_callback
                 )
+            except UploadError as e:
+                file_id = e.file_id
+                raise
             finally:
-                # Clean up the temporary file
+                # Closing the pipe stops both processes if the upload failed midway
+                encoder.stdout.close()
+                return_codes = await loop.run_in_executor(
+                    self._download_pool, lambda: (source.wait(), encoder.wait())
+                )
+
+            if any(return_codes):
+                raise Exception(f"Audio conversion failed with exit codes {return_codes}")
+
+            logger.info("File streamed to pCloud with ID: %s", file_id)
+            await self._finish_job(job, UPLOAD_SUCCESS_MESSAGE)
+        except Exception as e:
+            logger.error("Error streaming to pCloud: %s", e)
+            self._forget_missing_folders(e)
+            if file_id is not None:
+                # Don't leave a truncated MP3 behind in pCloud
                 try:
-                    if output_path and os.path.exists(output_path):
-                        os.remove(output_path)
-                        logger.info(f"Cleaned up temporary file: {output_path}")
-                except Exception as e:
-                    logger.error(f"Error cleaning up temporary file: {e}")
+                    await self._pcloud('deletefile', fileid=file_id)
+                except Exception as delete_error:
+                    logger.error("Error deleting partial upload %s: %s", file_id, delete_error)
+            await self._finish_job(job, "Error uploading the file to pCloud. Please try again later.")
+
+    async def _upload(self, batch: List[ConversionJob]) -> None:
+        """Upload a batch of downloaded MP3s to pCloud and clean up the temporary files."""
+        try:
+            if len(batch) == 1:
+                await self._upload_job(batch[0])
+            else:
+                await self._upload_batch(batch)
+        finally:
+            # Hand the temporary files over to the cleanup worker
+            for job in batch:
+                if job.output_path:
+                    self._delete_queue.put_nowait(job.output_path)
+
+    async def _upload_batch(self, batch: List[ConversionJob]) -> None:
+        """Upload several MP3s with one uploadfile call per folder, falling back to per-file uploads."""
+        folder_jobs: dict[int, List[ConversionJob]] = {}
+        for job in batch:
+            folder_jobs.setdefault(job.folder_id, []).append(job)
+
+        for folder_id, jobs in folder_jobs.items():
+            # Files with the same name would overwrite each other within one call,
+            # so only the first job of each name goes into the batch
+            batch_jobs: dict[str, ConversionJob] = {}
+            for job in jobs:
+                batch_jobs.setdefault(job.upload_name, job)
+            try:
+                uploaded = await self._upload_files(
+                    [(job.output_path, name) for name, job in batch_jobs.items()], folder_id
+                )
+                logger.info("Batch uploaded %d of %d files to pCloud", len(uploaded), len(jobs))
+            except Exception as e:
+                logger.error("Error batch uploading to pCloud: %s", e)
+                self._forget_missing_folders(e)
+                uploaded = set()
+
+            for job in jobs:
+                if batch_jobs[job.upload_name] is job and job.upload_name in uploaded:
+                    await self._finish_job(job, UPLOAD_SUCCESS_MESSAGE)
+                else:
+                    # Retry whatever the batch missed with the resumable upload
+                    await self._upload_job(job)
 
+    async def _upload_job(self, job: ConversionJob) -> None:
+        """Upload a single downloaded MP3 to pCloud."""
+        try:
+            # Upload to pCloud, reporting progress through the same queue
+            upload_message = await self._upload_to_pcloud(
+                job.output_path, job.upload_name, job.folder_id, job.progress_callback
+            )
         except Exception as e:
-            logger.error(f"Error processing YouTube URL: {e}")
-            await status_message.edit_text(f"An error occurred: {str(e)}")
+            logger.error("Error uploading to pCloud: %s", e)
+            upload_message = "Error uploading the file to pCloud. Please try again later."
+
+        # Send the success or error message
+        await self._finish_job(job, upload_message)
 
     def run(self):
         """Start the bot."""
+        if uvloop is not None:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
         self.application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == '__main__':
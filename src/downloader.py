@@ -3,27 +3,27 @@ YouTube video downloader and audio converter.
 """
 
 import os
+import sys
 import logging
 import asyncio
+import subprocess
+import threading
+import uuid
 from pathlib import Path
 from typing import Dict, Optional, Tuple, Callable
 from dataclasses import dataclass
 import yt_dlp
 from dotenv import load_dotenv
 import ffmpeg
-from .utils import get_safe_filename, format_file_size
+from .utils import get_safe_filename, format_file_size, get_file_stat, get_file_size
 
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 # Audio configuration
 DEFAULT_BITRATE = 128  # Always use 128kbps for consistent quality and file size
+LAME_COMPRESSION_LEVEL = 5  # LAME -q 5: good quality, noticeably faster than the default of 3
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class VideoInfo:
     """Data class to store video metadata."""
     id: str
@@ -50,10 +50,9 @@ class YouTubeDownloader:
         Args:
             temp_dir: Directory for temporary files. Defaults to env TEMP_DIR or '/tmp/ytbtomp3'
         """
-        load_dotenv()  # Load environment variables
-        
         self.temp_dir = temp_dir
         os.makedirs(temp_dir, exist_ok=True)
+        self.ffmpeg_path = os.getenv('FFMPEG_PATH', '/usr/bin/ffmpeg')
         
         # Configure yt-dlp options
         self.ydl_opts = {
@@ -64,15 +63,26 @@ class YouTubeDownloader:
             'outtmpl': str(Path(self.temp_dir) / '%(id)s.%(ext)s'),
         }
         
-        logger.info(f"Initialized YouTubeDownloader with temp_dir: {self.temp_dir}")
+        # Long-lived YoutubeDL instances for metadata lookups, one per thread since
+        # YoutubeDL is not thread-safe
+        self._local = threading.local()
+        
+        logger.info("Initialized YouTubeDownloader with temp_dir: %s", self.temp_dir)
+
+    def _info_ydl(self) -> yt_dlp.YoutubeDL:
+        """Get this thread's cached YoutubeDL instance for metadata extraction."""
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            ydl = self._local.ydl = yt_dlp.YoutubeDL(self.ydl_opts)
+        return ydl
 
     def _ensure_temp_dir(self) -> None:
         """Create temporary directory if it doesn't exist."""
         try:
             os.makedirs(self.temp_dir, exist_ok=True)
-            logger.debug(f"Ensured temp directory exists: {self.temp_dir}")
+            logger.debug("Ensured temp directory exists: %s", self.temp_dir)
         except OSError as e:
-            logger.error(f"Failed to create temp directory: {e}")
+            logger.error("Failed to create temp directory: %s", e)
             raise DownloadError(f"Could not create temp directory: {e}")
 
     def extract_video_info(self, url: str) -> VideoInfo:
@@ -88,30 +98,30 @@ class YouTubeDownloader:
         Raises:
             DownloadError: If video info extraction fails
         """
-        logger.info(f"Extracting video info for URL: {url}")
+        logger.info("Extracting video info for URL: %s", url)
         
         try:
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                video_info = VideoInfo(
-                    id=info['id'],
-                    title=info['title'],
-                    duration=info['duration'],
-                    filesize_approx=info.get('filesize_approx', 0),
-                    is_age_restricted=info.get('age_limit', 0) > 0,
-                    formats=info['formats'],
-                    thumbnail=info.get('thumbnail', ''),
-                    description=info.get('description', ''),
-                    uploader=info.get('uploader', 'Unknown')
-                )
-                
-                logger.info(f"Successfully extracted info for video: {video_info.title}")
-                logger.debug(f"Video details: duration={video_info.duration}s, "
-                           f"size={video_info.filesize_approx/1024/1024:.2f}MB")
-                
-                return video_info
-                
+            ydl = self._info_ydl()
+            info = ydl.extract_info(url, download=False)
+            
+            video_info = VideoInfo(
+                id=info['id'],
+                title=info['title'],
+                duration=info['duration'],
+                filesize_approx=info.get('filesize_approx', 0),
+                is_age_restricted=info.get('age_limit', 0) > 0,
+                formats=info['formats'],
+                thumbnail=info.get('thumbnail', ''),
+                description=info.get('description', ''),
+                uploader=info.get('uploader', 'Unknown')
+            )
+            
+            logger.info("Successfully extracted info for video: %s", video_info.title)
+            logger.debug("Video details: duration=%ss, size=%.2fMB",
+                         video_info.duration, video_info.filesize_approx/1024/1024)
+            
+            return video_info
+            
         except Exception as e:
             error_msg = f"Failed to extract video info: {str(e)}"
             logger.error(error_msg)
@@ -132,30 +142,31 @@ class YouTubeDownloader:
         # Add 1% overhead for MP3 headers and metadata
         estimated_size = int((bitrate * 1000 / 8) * video_info.duration * 1.01)
         
-        logger.info(f"Estimated MP3 size for {video_info.title}: "
-                   f"{estimated_size/1024/1024:.2f}MB at {bitrate}kbps")
+        logger.info("Estimated MP3 size for %s: %.2fMB at %skbps",
+                    video_info.title, estimated_size/1024/1024, bitrate)
         
         return estimated_size
 
     def get_video_info(self, url: str) -> Optional[dict]:
         """Get video information without downloading."""
         try:
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return {
-                    'title': info.get('title'),
-                    'duration': info.get('duration'),
-                    'filesize_approx': info.get('filesize_approx'),
-                    'thumbnail': info.get('thumbnail')
-                }
+            ydl = self._info_ydl()
+            info = ydl.extract_info(url, download=False)
+            return {
+                'title': info.get('title'),
+                'duration': info.get('duration'),
+                'filesize_approx': info.get('filesize_approx'),
+                'thumbnail': info.get('thumbnail')
+            }
         except Exception as e:
-            logger.error(f"Error getting video info: {e}")
+            logger.error("Error getting video info: %s", e)
             return None
 
     def download_audio(
         self,
         url: str,
-        progress_callback: Optional[Callable[[float, str], None]] = None
+        progress_callback: Optional[Callable[[float, str], None]] = None,
+        info: Optional[VideoInfo] = None
     ) -> Tuple[Optional[str], Optional[str]]:
         """
         Download and convert video to MP3.
@@ -163,59 +174,71 @@ class YouTubeDownloader:
         Args:
             url: YouTube video URL
             progress_callback: Optional callback function for progress updates
+            info: Already extracted video info, to skip fetching it again
             
         Returns:
             Tuple of (output_path, error_message). If successful, error_message is None.
             If failed, output_path is None and error_message contains the error.
         """
-        logger.info(f"Starting download for URL: {url}")
+        logger.info("Starting download for URL: %s", url)
         
         try:
-            # Get video info first
-            info = self.extract_video_info(url)
+            # Get video info first, unless the caller already has it
+            info = info or self.extract_video_info(url)
             safe_title = get_safe_filename(info.title)
-            output_template = os.path.join(self.temp_dir, safe_title)
+            # Unique per call, so parallel jobs for the same video never share a file
+            file_stem = f"{safe_title}-{info.id}-{uuid.uuid4().hex[:8]}"
+            output_template = os.path.join(self.temp_dir, file_stem)
             output_path = f"{output_template}.mp3"
 
             def progress_hook(d):
-                if d['status'] == 'downloading' and progress_callback:
+                if not progress_callback:
+                    return
+                if d['status'] == 'downloading':
                     total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
                     downloaded = d.get('downloaded_bytes', 0)
                     if total > 0:
                         progress = (downloaded / total) * 100
                         progress_callback(progress, f"Downloading: {format_file_size(downloaded)} / {format_file_size(total)}")
-                elif d['status'] == 'finished' and progress_callback:
+                elif d['status'] == 'finished':
                     progress_callback(100, "Download complete, converting to MP3...")
 
             ydl_opts = {
-                'format': 'bestaudio/best',
+                # Prefer a native MP3 stream: FFmpegExtractAudio copies it instead of re-encoding
+                'format': f'bestaudio[acodec=mp3][abr<={DEFAULT_BITRATE}]/bestaudio/best',
                 'postprocessors': [{
                     'key': 'FFmpegExtractAudio',
                     'preferredcodec': 'mp3',
                     'preferredquality': str(DEFAULT_BITRATE),
                 }],
+                'postprocessor_args': {
+                    'extractaudio': ['-compression_level', str(LAME_COMPRESSION_LEVEL)],
+                },
                 'outtmpl': output_template,  # yt-dlp will append the extension
                 'progress_hooks': [progress_hook],
                 'quiet': True,
                 'no_warnings': True,
-                'ffmpeg_location': os.getenv('FFMPEG_PATH', '/usr/bin/ffmpeg')  # Use environment variable with fallback
+                'ffmpeg_location': self.ffmpeg_path
             }
 
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                logger.info(f"Downloading and converting video: {info.title}")
+                logger.info("Downloading and converting video: %s", info.title)
+                # download() returns only after the postprocessors have written the MP3
                 ydl.download([url])
                 
-                # Wait a moment for file operations to complete
-                import time
-                time.sleep(1)
-                
-                if os.path.exists(output_path):
-                    file_size = os.path.getsize(output_path)
-                    logger.info(f"Successfully created MP3: {output_path} ({format_file_size(file_size)})")
+                # One stat call both checks for the MP3 and gives its size
+                try:
+                    file_stat = get_file_stat(output_path)
+                except FileNotFoundError:
+                    file_stat = None
+
+                if file_stat:
+                    logger.info("Successfully created MP3: %s (%s)",
+                                output_path, format_file_size(file_stat.st_size))
                     return output_path, None
                 else:
                     # Check if the file exists with any extension
-                    possible_files = [f for f in os.listdir(self.temp_dir) if f.startswith(safe_title)]
+                    possible_files = [f for f in os.listdir(self.temp_dir) if f.startswith(file_stem)]
                     if possible_files:
                         error_msg = f"Found unexpected files: {', '.join(possible_files)}"
                     else:
@@ -228,6 +251,57 @@ class YouTubeDownloader:
             logger.error(error_msg)
             return None, error_msg
 
+    def stream_audio(self, url: str) -> Tuple[subprocess.Popen, subprocess.Popen]:
+        """
+        Start converting a video to MP3 without writing anything to disk.
+        
+        yt-dlp writes the raw audio to a pipe that ffmpeg encodes from, so the MP3
+        can be read from the encoder's stdout while it is being produced.
+        
+        Args:
+            url: YouTube video URL
+            
+        Returns:
+            Tuple of (source_process, encoder_process). Read the MP3 from
+            encoder_process.stdout, then wait for both processes; a non-zero
+            exit code from either means the stream is incomplete.
+        """
+        logger.info("Starting audio stream for URL: %s", url)
+
+        encode = (
+            ffmpeg
+            .input('pipe:')
+            .output(
+                'pipe:',
+                format='mp3',
+                acodec='libmp3lame',
+                audio_bitrate=f'{DEFAULT_BITRATE}k',
+                compression_level=LAME_COMPRESSION_LEVEL
+            )
+            .global_args('-loglevel', 'error')
+        )
+        source = subprocess.Popen(
+            [sys.executable, '-m', 'yt_dlp', '--quiet', '--no-warnings',
+             '-f', 'bestaudio/best', '-o', '-', url],
+            stdout=subprocess.PIPE
+        )
+        try:
+            encoder = subprocess.Popen(
+                encode.compile(cmd=self.ffmpeg_path),
+                stdin=source.stdout,
+                stdout=subprocess.PIPE
+            )
+        except Exception:
+            # Without an encoder yt-dlp would block on the full pipe forever
+            source.stdout.close()
+            source.kill()
+            source.wait()
+            raise
+        # Let yt-dlp see a broken pipe if ffmpeg exits early
+        source.stdout.close()
+
+        return source, encoder
+
     def cleanup_file(self, file_path: str) -> bool:
         """
         Clean up a file from the temporary directory.
@@ -241,11 +315,11 @@ class YouTubeDownloader:
         try:
             if os.path.exists(file_path):
                 os.remove(file_path)
-                logger.info(f"Cleaned up file: {file_path}")
+                logger.info("Cleaned up file: %s", file_path)
                 return True
             return False
         except Exception as e:
-            logger.error(f"Error cleaning up file {file_path}: {e}")
+            logger.error("Error cleaning up file %s: %s", file_path, e)
             return False
 
     def get_audio_duration(self, file_path: str) -> Optional[float]:
@@ -254,7 +328,7 @@ class YouTubeDownloader:
             probe = ffmpeg.probe(file_path)
             return float(probe['streams'][0]['duration'])
         except Exception as e:
-            logger.error(f"Error getting audio duration: {e}")
+            logger.error("Error getting audio duration: %s", e)
             return None
 
     def get_audio_bitrate(self, file_path: str) -> Optional[int]:
@@ -263,10 +337,17 @@ class YouTubeDownloader:
             probe = ffmpeg.probe(file_path)
             return int(probe['streams'][0]['bit_rate']) // 1000
         except Exception as e:
-            logger.error(f"Error getting audio bitrate: {e}")
+            logger.error("Error getting audio bitrate: %s", e)
             return None
 
 if __name__ == '__main__':
+    # Configure logging
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    load_dotenv()  # Load environment variables
+
     # Test the implementation with the test URL from environment
     test_url = os.getenv('YOUTUBE_TEST_URL')
     if test_url:
@@ -296,7 +377,7 @@ if __name__ == '__main__':
                 print(f"\nError: {error}")
             else:
                 # Get actual file info
-                file_size = os.path.getsize(output_path)
+                file_size = get_file_size(output_path)
                 print(f"\n\nSuccess! Created MP3: {os.path.basename(output_path)}")
                 print(f"File size: {format_file_size(file_size)}")
                 
@@ -0,0 +1,217 @@
+"""Chunked uploads to pCloud through the fileops API."""
+import time
+import logging
+import contextlib
+from typing import Optional, Callable, BinaryIO, List, Tuple, TYPE_CHECKING
+import requests
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from .utils import format_file_size
+
+if TYPE_CHECKING:
+    from pcloud import PyCloud
+
+logger = logging.getLogger(__name__)
+
+# pCloud fileops open flags
+PCLOUD_O_WRITE = 0x0002
+PCLOUD_O_CREAT = 0x0040
+PCLOUD_O_TRUNC = 0x0200
+
+# Chunked upload configuration
+UPLOAD_CHUNK_SIZE = 10 * 1024 * 1024  # 10 MB per file_pwrite call
+UPLOAD_RETRIES = 3
+UPLOAD_TIMEOUT = (10, 120)  # (connect, read) seconds, so a stalled connection is retried
+
+class PCloudError(Exception):
+    """pCloud answered an upload call with an error result."""
+
+class UploadError(Exception):
+    """A failed upload; file_id is the partly written file in pCloud, if it was created."""
+
+    def __init__(self, message: str, file_id: Optional[int] = None):
+        super().__init__(message)
+        self.file_id = file_id
+
+class FileUpload:
+    """
+    A single file being written to pCloud.
+
+    pCloud file descriptors only live as long as the connection that opened
+    them, so every call of an upload goes through a session of its own that is
+    used by one thread at a time and therefore keeps one keep-alive connection.
+    """
+
+    def __init__(self, pcloud: 'PyCloud', folder_id: int, filename: str):
+        self.endpoint = pcloud.endpoint
+        self.auth_token = pcloud.auth_token
+        self.headers = dict(pcloud.session.headers)
+        self.folder_id = folder_id
+        self.filename = filename
+        self.file_id: Optional[int] = None
+        self.fd: Optional[int] = None
+        self.session = self._new_session()
+
+    def _new_session(self) -> requests.Session:
+        """Create a session with the same headers as the PyCloud client."""
+        session = requests.Session()
+        session.headers.update(self.headers)
+        return session
+
+    def _call(self, method: str, data: Optional[bytes] = None, **params) -> dict:
+        """Call a pCloud API method, sending data (if any) as the raw request body."""
+        response = self.session.post(
+            self.endpoint + method,
+            params={'auth': self.auth_token, **params},
+            data=data,
+            timeout=UPLOAD_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def open(self) -> None:
+        """Create (or truncate) the file, or reopen it after the connection was lost."""
+        if self.file_id is None:
+            result = self._call(
+                'file_open',
+                flags=PCLOUD_O_WRITE | PCLOUD_O_CREAT | PCLOUD_O_TRUNC,
+                folderid=self.folder_id,
+                name=self.filename
+            )
+        else:
+            # Keep what was already written; the caller continues at its offset
+            result = self._call('file_open', flags=PCLOUD_O_WRITE, fileid=self.file_id)
+        if result.get('result') != 0 or 'fd' not in result:
+            raise PCloudError(result.get('error', f"Unexpected response {result}"))
+        self.fd = result['fd']
+        self.file_id = result['fileid']
+
+    def _reconnect(self) -> None:
+        """Drop the connection, and the descriptor with it, so the next write reopens the file."""
+        self.session.close()
+        self.session = self._new_session()
+        self.fd = None
+
+    def _retry(self, step: Callable[[], None], failure: str) -> None:
+        """Run an upload step on an open file, reconnecting and backing off between failed attempts."""
+        for attempt in range(UPLOAD_RETRIES):
+            try:
+                if self.fd is None:
+                    self.open()
+                step()
+                return
+            except (requests.RequestException, PCloudError) as e:
+                error = str(e)
+            self._reconnect()
+
+            if attempt < UPLOAD_RETRIES - 1:
+                logger.warning("%s (%s), retrying...", failure, error)
+                time.sleep(2 ** attempt)
+
+        raise PCloudError(f"{failure}: {error}")
+
+    def start(self) -> None:
+        """Create the file in pCloud, retrying like a chunk write."""
+        self._retry(lambda: None, "Could not open file in pCloud")
+
+    def write(self, offset: int, chunk: bytes) -> None:
+        """Write a chunk at the given offset, retrying with exponential backoff."""
+        def pwrite():
+            result = self._call('file_pwrite', data=chunk, fd=self.fd, offset=offset)
+            if result.get('bytes') != len(chunk):
+                raise PCloudError(result.get('error', 'Unexpected response'))
+
+        self._retry(pwrite, f"Upload failed at offset {offset}")
+
+    def close(self) -> None:
+        """Close the file and its connection."""
+        try:
+            if self.fd is not None:
+                self._call('file_close', fd=self.fd)
+        except requests.RequestException as e:
+            logger.warning("Could not close pCloud file %s: %s", self.filename, e)
+        finally:
+            self.fd = None
+            self.session.close()
+
+def upload_stream(
+    pcloud: 'PyCloud',
+    stream: BinaryIO,
+    filename: str,
+    folder_id: int,
+    total: int,
+    progress_callback: Optional[Callable[[float, str], None]] = None
+) -> int:
+    """
+    Upload a binary stream to pCloud in chunks.
+
+    Blocks until the upload is done, so run it in a worker thread.
+
+    Args:
+        pcloud: Logged in PyCloud client
+        stream: Binary stream to read the file from
+        filename: Name of the file in pCloud
+        folder_id: ID of the pCloud folder to upload into
+        total: Expected size in bytes, used for progress reporting
+        progress_callback: Optional callback function for progress updates
+
+    Returns:
+        The pCloud file ID of the uploaded file
+
+    Raises:
+        UploadError: If the upload failed, with the ID of the partly written file
+    """
+    upload = FileUpload(pcloud, folder_id, filename)
+    try:
+        upload.start()
+        offset = 0
+        while chunk := stream.read(UPLOAD_CHUNK_SIZE):
+            upload.write(offset, chunk)
+            offset += len(chunk)
+            if progress_callback and total > 0:
+                progress_callback(
+                    min((offset / total) * 100, 100),
+                    f"Uploading: {format_file_size(offset)} / {format_file_size(total)}"
+                )
+    except Exception as e:
+        raise UploadError(str(e), upload.file_id) from e
+    finally:
+        upload.close()
+
+    return upload.file_id
+
+def upload_files(pcloud: 'PyCloud', files: List[Tuple[str, str]], folder_id: int) -> set:
+    """
+    Upload several files in a single uploadfile call, streaming them from disk.
+
+    PyCloud.uploadfile names every file after its local path, but temporary
+    files have unique names of their own, so the multipart request is built
+    here the same way PyCloud does it, with an explicit name per file.
+    MultipartEncoder reads the open files in small blocks while sending, so
+    no MP3 is ever held in memory as a whole.
+
+    Blocks until the upload is done, so run it in a worker thread.
+
+    Args:
+        pcloud: Logged in PyCloud client
+        files: Pairs of (local path, name of the file in pCloud)
+        folder_id: ID of the pCloud folder to upload into
+
+    Returns:
+        The names of the files pCloud stored
+    """
+    with contextlib.ExitStack() as stack:
+        fields = [('auth', pcloud.auth_token), ('folderid', str(folder_id))]
+        fields.extend(
+            ('file', (name, stack.enter_context(open(path, 'rb')))) for path, name in files
+        )
+        encoder = MultipartEncoder(fields=fields)
+        response = requests.post(
+            pcloud.endpoint + 'uploadfile',
+            data=encoder,
+            headers={'Content-Type': encoder.content_type},
+            timeout=UPLOAD_TIMEOUT
+        )
+    upload_result = response.json()
+    if upload_result.get('result') != 0 or 'metadata' not in upload_result:
+        raise Exception(f"Upload failed: {upload_result}")
+    return {item['name'] for item in upload_result['metadata']}
@@ -0,0 +1,74 @@
+"""Tests for the progress reporting of conversion jobs."""
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+import pytest
+from . import bot
+from .bot import YouTubeBot, ConversionJob
+
+def progress_text(progress, status):
+    """The status message the reporter renders for a progress update."""
+    return f"Converting: Song\n{status}\nProgress: {progress:.1f}%"
+
+async def settle():
+    """Let the reporter handle everything that is queued."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+def run_reporter(scenario):
+    """Run the progress reporter of one job through a scenario and return the texts it showed."""
+    async def main():
+        message = mock.Mock(edit_text=mock.AsyncMock())
+        job = ConversionJob('https://youtu.be/xxxxxxxxxxx', message, None)
+        job.video_info = SimpleNamespace(title='Song')
+        youtube_bot = object.__new__(YouTubeBot)
+        job.progress_task = asyncio.create_task(youtube_bot._report_progress(job))
+        await scenario(job)
+        await youtube_bot._stop_progress(job)
+        return [call.args[0] for call in message.edit_text.await_args_list]
+    return asyncio.run(main())
+
+@pytest.fixture
+def interval(monkeypatch):
+    monkeypatch.setattr(bot, 'PROGRESS_EDIT_INTERVAL', 0.05)
+    return 0.05
+
+def test_progress_edits_are_throttled(interval):
+    async def scenario(job):
+        for progress in (10, 20, 30):
+            job.progress_callback(progress, "Downloading")
+            await settle()
+        await asyncio.sleep(interval * 2)
+
+    assert run_reporter(scenario) == [
+        progress_text(10, "Downloading"),
+        progress_text(30, "Downloading"),
+    ]
+
+def test_stage_replaces_pending_progress(interval):
+    async def scenario(job):
+        job.progress_callback(10, "Downloading")
+        await settle()
+        job.progress_callback(100, "Download complete")
+        await settle()
+        job.show_stage("Download complete: Song\nUploading to pCloud...")
+        await settle()
+        await asyncio.sleep(interval * 2)
+
+    assert run_reporter(scenario) == [
+        progress_text(10, "Downloading"),
+        "Download complete: Song\nUploading to pCloud...",
+    ]
+
+def test_stage_is_shown_when_progress_is_queued_behind_it(interval):
+    async def scenario(job):
+        job.progress_callback(10, "Downloading")
+        await settle()
+        # A fast upload queues its progress before the reporter gets to run
+        job.show_stage("Download complete: Song\nUploading to pCloud...")
+        job.progress_queue.put_nowait((100, "Uploading"))
+
+    assert run_reporter(scenario) == [
+        progress_text(10, "Downloading"),
+        "Download complete: Song\nUploading to pCloud...",
+    ]
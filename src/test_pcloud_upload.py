@@ -0,0 +1,171 @@
+"""Tests for the chunked pCloud upload."""
+import io
+from types import SimpleNamespace
+from unittest import mock
+import pytest
+import requests
+from . import pcloud_upload
+from .pcloud_upload import upload_stream, upload_files, UploadError
+
+ENDPOINT = 'https://api.pcloud.com/'
+
+def make_pcloud():
+    """A stand-in for a logged in PyCloud client."""
+    return SimpleNamespace(
+        endpoint=ENDPOINT,
+        auth_token='token',
+        session=SimpleNamespace(headers={'User-Agent': 'test'})
+    )
+
+def response(payload):
+    """A successful HTTP response carrying a pCloud JSON result."""
+    resp = mock.Mock()
+    resp.json.return_value = payload
+    return resp
+
+def api(calls, fd=1):
+    """Fake pCloud server answering every fileops call made through a session."""
+    def post(url, params, data=None, timeout=None):
+        assert timeout == pcloud_upload.UPLOAD_TIMEOUT
+        method = url[len(ENDPOINT):]
+        calls.append((method, params, data))
+        if method == 'file_open':
+            return response({'result': 0, 'fd': fd, 'fileid': 42})
+        if method == 'file_pwrite':
+            return response({'result': 0, 'bytes': len(data)})
+        return response({'result': 0})
+    return post
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(pcloud_upload.time, 'sleep', lambda seconds: None)
+
+def test_chunks_are_posted_as_request_body(monkeypatch):
+    monkeypatch.setattr(pcloud_upload, 'UPLOAD_CHUNK_SIZE', 4)
+    calls = []
+    session = mock.Mock(post=mock.Mock(side_effect=api(calls)), headers={})
+    with mock.patch.object(pcloud_upload.requests, 'Session', return_value=session) as session_cls:
+        file_id = upload_stream(make_pcloud(), io.BytesIO(b'abcdefghij'), 'song.mp3', 7, 10)
+
+    assert file_id == 42
+    # Open, writes and close all go over the same session
+    session_cls.assert_called_once_with()
+    assert [method for method, _, _ in calls] == [
+        'file_open', 'file_pwrite', 'file_pwrite', 'file_pwrite', 'file_close'
+    ]
+    assert calls[0][1] == {
+        'auth': 'token',
+        'flags': pcloud_upload.PCLOUD_O_WRITE | pcloud_upload.PCLOUD_O_CREAT | pcloud_upload.PCLOUD_O_TRUNC,
+        'folderid': 7,
+        'name': 'song.mp3'
+    }
+    assert [(params, data) for method, params, data in calls if method == 'file_pwrite'] == [
+        ({'auth': 'token', 'fd': 1, 'offset': 0}, b'abcd'),
+        ({'auth': 'token', 'fd': 1, 'offset': 4}, b'efgh'),
+        ({'auth': 'token', 'fd': 1, 'offset': 8}, b'ij'),
+    ]
+    assert calls[-1] == ('file_close', {'auth': 'token', 'fd': 1}, None)
+    assert session.headers == {'User-Agent': 'test'}
+
+def test_lost_connection_reopens_file_and_resumes(monkeypatch):
+    monkeypatch.setattr(pcloud_upload, 'UPLOAD_CHUNK_SIZE', 4)
+    first_calls, second_calls = [], []
+    first_post = api(first_calls)
+
+    def dropping_post(url, params, data=None, timeout=None):
+        if url.endswith('file_pwrite') and params['offset'] == 4:
+            raise requests.Timeout('read timed out')
+        return first_post(url, params, data, timeout)
+
+    first = mock.Mock(post=mock.Mock(side_effect=dropping_post), headers={})
+    second = mock.Mock(post=mock.Mock(side_effect=api(second_calls, fd=2)), headers={})
+    with mock.patch.object(pcloud_upload.requests, 'Session', side_effect=[first, second]):
+        file_id = upload_stream(make_pcloud(), io.BytesIO(b'abcdefgh'), 'song.mp3', 7, 8)
+
+    assert file_id == 42
+    first.close.assert_called_once_with()
+    # The new connection reopens the same file without truncating it
+    assert second_calls[0] == (
+        'file_open', {'auth': 'token', 'flags': pcloud_upload.PCLOUD_O_WRITE, 'fileid': 42}, None
+    )
+    assert second_calls[1] == ('file_pwrite', {'auth': 'token', 'fd': 2, 'offset': 4}, b'efgh')
+    assert second_calls[-1] == ('file_close', {'auth': 'token', 'fd': 2}, None)
+
+def test_failed_reopen_is_retried(monkeypatch):
+    monkeypatch.setattr(pcloud_upload, 'UPLOAD_CHUNK_SIZE', 4)
+    calls = []
+    post = api(calls)
+    failures = iter(['drop', 'reopen'])
+
+    def flaky_post(url, params, data=None, timeout=None):
+        if url.endswith('file_pwrite') and params['offset'] == 4 and next(failures, None) == 'drop':
+            raise requests.ConnectionError('connection reset')
+        if url.endswith('file_open') and 'fileid' in params and next(failures, None) == 'reopen':
+            calls.append(('file_open', params, data))
+            return response({'result': 5000, 'error': 'Internal error, try again.'})
+        return post(url, params, data, timeout)
+
+    session = mock.Mock(post=mock.Mock(side_effect=flaky_post), headers={})
+    with mock.patch.object(pcloud_upload.requests, 'Session', return_value=session):
+        file_id = upload_stream(make_pcloud(), io.BytesIO(b'abcdefgh'), 'song.mp3', 7, 8)
+
+    assert file_id == 42
+    assert [method for method, _, _ in calls] == [
+        'file_open', 'file_pwrite', 'file_open', 'file_open', 'file_pwrite', 'file_close'
+    ]
+    assert calls[-2] == ('file_pwrite', {'auth': 'token', 'fd': 1, 'offset': 4}, b'efgh')
+
+def test_failed_first_open_is_retried():
+    calls = []
+    post = api(calls)
+    results = iter([{'result': 5000, 'error': 'Internal error, try again.'}])
+
+    def flaky_post(url, params, data=None, timeout=None):
+        if url.endswith('file_open') and (result := next(results, None)):
+            return response(result)
+        return post(url, params, data, timeout)
+
+    session = mock.Mock(post=mock.Mock(side_effect=flaky_post), headers={})
+    with mock.patch.object(pcloud_upload.requests, 'Session', return_value=session):
+        assert upload_stream(make_pcloud(), io.BytesIO(b'abcd'), 'song.mp3', 7, 4) == 42
+
+    assert [method for method, _, _ in calls] == ['file_open', 'file_pwrite', 'file_close']
+    assert calls[0][1]['name'] == 'song.mp3'
+
+def test_upload_fails_after_retries(monkeypatch):
+    calls = []
+    post = api(calls)
+
+    def failing_post(url, params, data=None, timeout=None):
+        if url.endswith('file_pwrite'):
+            return response({'result': 2009, 'error': 'File not found.'})
+        return post(url, params, data, timeout)
+
+    session = mock.Mock(post=mock.Mock(side_effect=failing_post), headers={})
+    with mock.patch.object(pcloud_upload.requests, 'Session', return_value=session):
+        with pytest.raises(UploadError, match='Upload failed at offset 0: File not found.') as excinfo:
+            upload_stream(make_pcloud(), io.BytesIO(b'abcd'), 'song.mp3', 7, 4)
+
+    # The caller gets the partly written file so it can delete it
+    assert excinfo.value.file_id == 42
+
+def test_batch_upload_uses_given_names(tmp_path):
+    first, second = tmp_path / 'a-x1-0001.mp3', tmp_path / 'b-x2-0002.mp3'
+    first.write_bytes(b'first')
+    second.write_bytes(b'second')
+    metadata = [{'name': 'Song A.mp3'}, {'name': 'Song B.mp3'}]
+
+    with mock.patch.object(pcloud_upload.requests, 'post', return_value=response(
+        {'result': 0, 'metadata': metadata}
+    )) as post:
+        uploaded = upload_files(
+            make_pcloud(), [(str(first), 'Song A.mp3'), (str(second), 'Song B.mp3')], 7
+        )
+
+    assert uploaded == {'Song A.mp3', 'Song B.mp3'}
+    encoder = post.call_args.kwargs['data']
+    assert post.call_args.args == (ENDPOINT + 'uploadfile',)
+    assert post.call_args.kwargs['timeout'] == pcloud_upload.UPLOAD_TIMEOUT
+    assert [(name, value if isinstance(value, str) else value[0]) for name, value in encoder.fields] == [
+        ('auth', 'token'), ('folderid', '7'), ('file', 'Song A.mp3'), ('file', 'Song B.mp3')
+    ]
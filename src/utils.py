@@ -1,20 +1,27 @@
 """Utility functions for the YouTube to MP3 converter."""
 import os
 import re
+import time
 import logging
 from typing import Optional, Union, List
-from datetime import datetime, timedelta
-import math
+from functools import lru_cache
 from dataclasses import dataclass
 
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
-@dataclass
+# URL patterns, compiled once at import
+_YT_URL_RE = re.compile(
+    r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/'
+    r'(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
+)
+# 'be/' (youtu.be links) is covered by the '/' alternative
+_VIDEO_ID_RE = re.compile(r'(?:v=|/)([0-9A-Za-z_-]{11})')
+
+# Filename sanitizing: characters to drop and runs to replace with '_'
+_INVALID_CHARS_TBL = str.maketrans('', '', '<>:"/\\|?*')
+_WS_DOT_RE = re.compile(r'[\s.]+')
+
+@dataclass(slots=True, frozen=True)
 class VideoInfo:
     """Information about a YouTube video."""
     id: str
@@ -35,23 +42,19 @@ def setup_temp_directory(temp_dir: str = "./tmp") -> str:
 def cleanup_old_files(temp_dir: str, hours: int = 24) -> None:
     """Remove files older than specified hours from temp directory."""
     try:
-        cutoff = datetime.now() - timedelta(hours=hours)
-        for filename in os.listdir(temp_dir):
-            filepath = os.path.join(temp_dir, filename)
-            if os.path.isfile(filepath):
-                if datetime.fromtimestamp(os.path.getmtime(filepath)) < cutoff:
-                    os.remove(filepath)
-                    logger.info(f"Removed old file: {filepath}")
+        cutoff_ts = time.time() - hours * 3600.0
+        with os.scandir(temp_dir) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff_ts:
+                    os.remove(entry.path)
+                    logger.info("Removed old file: %s", entry.path)
     except Exception as e:
-        logger.error(f"Error cleaning up old files: {e}")
+        logger.error("Error cleaning up old files: %s", e)
 
+@lru_cache(maxsize=1024)
 def is_valid_youtube_url(url: str) -> bool:
     """Check if the URL is a valid YouTube URL."""
-    youtube_regex = (
-        r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/'
-        r'(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
-    )
-    return bool(re.match(youtube_regex, url))
+    return _YT_URL_RE.match(url) is not None
 
 def get_safe_filename(filename: str) -> str:
     """
@@ -64,12 +67,12 @@ def get_safe_filename(filename: str) -> str:
         A sanitized filename safe for all operating systems
     """
     # Remove invalid characters
-    filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+    filename = filename.translate(_INVALID_CHARS_TBL)
     # Replace spaces and dots with underscores, except the last dot
-    parts = filename.rsplit('.', 1)
-    parts[0] = re.sub(r'[\s.]+', '_', parts[0])
-    # Join back with the extension if it existed
-    return '.'.join(parts) if len(parts) > 1 else parts[0]
+    head, sep, ext = filename.rpartition('.')
+    if sep:
+        return f"{_WS_DOT_RE.sub('_', head)}.{ext}"
+    return _WS_DOT_RE.sub('_', filename)
 
 def format_file_size(size_bytes: Union[int, float]) -> str:
     """
@@ -81,27 +84,33 @@ def format_file_size(size_bytes: Union[int, float]) -> str:
     Returns:
         Formatted string (e.g., "1.23 MB")
     """
-    if size_bytes == 0:
+    if size_bytes <= 0:
         return "0 B"
         
     size_names = ("B", "KB", "MB", "GB", "TB")
-    magnitude = int(math.floor(math.log(size_bytes, 1024)))
-    val = size_bytes / math.pow(1024, magnitude)
+    # Each magnitude step is 10 bits (1024)
+    magnitude = min(max((int(size_bytes).bit_length() - 1) // 10, 0), len(size_names) - 1)
+    val = size_bytes / (1 << (magnitude * 10))
     
     return f"{val:.2f} {size_names[magnitude]}"
 
+@lru_cache(maxsize=1024)
 def get_video_id(url: str) -> Optional[str]:
     """Extract video ID from YouTube URL."""
-    patterns = [
-        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-        r'(?:be\/)([0-9A-Za-z_-]{11}).*'
-    ]
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+def get_file_stat(file_path: str) -> os.stat_result:
+    """
+    Get the stat result of a file, so callers can read several fields from one syscall.
     
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        The file's os.stat_result
+    """
+    return os.stat(file_path)
 
 def get_file_size(file_path: str) -> int:
     """
@@ -113,4 +122,4 @@ def get_file_size(file_path: str) -> int:
     Returns:
         File size in bytes
     """
-    return os.path.getsize(file_path)
+    return get_file_stat(file_path).st_size